@@ -30,6 +30,10 @@ class EEGAcquisition:
         self._is_synthetic: bool = synthetic
         self._sampling_rate: int = 0
         self._eeg_channels: list[int] = []
+        self._timestamp_channel: int = 0
+        self._latest_timestamp: float = 0.0
+        # Reused across reads; grown on demand in get_latest_eeg
+        self._eeg_buffer: NDArray[np.float32] = np.empty(0, dtype=np.float32)
 
     @property
     def is_synthetic(self) -> bool:
@@ -51,6 +55,11 @@ class EEGAcquisition:
     def eeg_channels(self) -> list[int]:
         return self._eeg_channels
 
+    @property
+    def latest_timestamp(self) -> float:
+        """BrainFlow timestamp of the newest sample returned by the last read."""
+        return self._latest_timestamp
+
     def start(self) -> None:
         """Start the BrainFlow session, falling back to synthetic on failure."""
         if self._force_synthetic:
@@ -79,6 +88,7 @@ class EEGAcquisition:
         all_eeg = BoardShim.get_eeg_channels(board_id)
         # Muse 2 has 4 EEG channels; synthetic has 16 — take first 4
         self._eeg_channels = all_eeg[:4]
+        self._timestamp_channel = BoardShim.get_timestamp_channel(board_id)
 
         mode = "synthetic" if self._is_synthetic else "live"
         logger.info(
@@ -86,15 +96,31 @@ class EEGAcquisition:
             board_id, mode, self._sampling_rate, self._eeg_channels,
         )
 
-    def get_latest_data(self, num_samples: int) -> NDArray[np.float64]:
-        """Non-destructive read of the most recent samples from the ring buffer.
+    def get_latest_eeg(self, num_samples: int) -> NDArray[np.float32]:
+        """Non-destructive read of the most recent EEG samples from the ring buffer.
 
-        Returns array of shape (num_channels, num_samples) containing all
-        board channels. Use `eeg_channels` indices to extract EEG data.
+        Returns a C-contiguous float32 array of shape (len(eeg_channels), n),
+        n <= num_samples, with rows in `channel_names` order. The array is a
+        view of a buffer reused across calls and is overwritten by the next
+        read; it is marked read-only so in-process callers cannot corrupt it.
+        Copy it to keep it past the next call.
         """
         if self._board is None:
             raise RuntimeError("Board not started")
-        return self._board.get_current_board_data(num_samples)
+        data = self._board.get_current_board_data(num_samples)
+
+        n_rows, n = len(self._eeg_channels), data.shape[1]
+        if n > 0:
+            self._latest_timestamp = float(data[self._timestamp_channel, -1])
+        if self._eeg_buffer.size < n_rows * n:
+            self._eeg_buffer = np.empty(n_rows * max(n, num_samples), dtype=np.float32)
+        eeg = self._eeg_buffer[: n_rows * n].reshape(n_rows, n)
+        for row, ch in zip(eeg, self._eeg_channels):
+            np.copyto(row, data[ch])
+        # The buffer is reused across calls; fail loudly if a caller in this
+        # process writes to it (pickled copies sent to the DSP worker drop the flag)
+        eeg.flags.writeable = False
+        return eeg
 
     def stop(self) -> None:
         """Stop streaming and release the board session."""
@@ -19,7 +19,7 @@ from fastapi.responses import FileResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 
 from acquisition import EEGAcquisition
-from server import ConnectionManager, broadcast_loop
+from server import WINDOW_SECONDS, ConnectionManager, DSPWorker, broadcast_loop
 
 logging.basicConfig(
     level=logging.INFO,
@@ -31,6 +31,7 @@ logger = logging.getLogger(__name__)
 acq: EEGAcquisition
 manager: ConnectionManager
 _broadcast_task: asyncio.Task  # type: ignore[type-arg]
+_dsp: DSPWorker
 _cli_args: argparse.Namespace
 
 
@@ -45,15 +46,22 @@ def parse_args() -> argparse.Namespace:
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
-    """Manage BrainFlow session and broadcast task lifecycle."""
-    global acq, manager, _broadcast_task
+    """Manage BrainFlow session, DSP worker, and broadcast task lifecycle."""
+    global acq, manager, _broadcast_task, _dsp
 
     acq = EEGAcquisition(synthetic=_cli_args.synthetic)
     manager = ConnectionManager()
 
     acq.start()
+    # Start the DSP worker and build its PSD plan before serving the first update
+    _dsp = DSPWorker(
+        acq.sampling_rate,
+        int(acq.sampling_rate * WINDOW_SECONDS),
+        len(acq.eeg_channels),
+    )
+    await _dsp.start()
     _broadcast_task = asyncio.create_task(
-        broadcast_loop(acq, manager, update_hz=_cli_args.update_hz)
+        broadcast_loop(acq, manager, _dsp, update_hz=_cli_args.update_hz)
     )
 
     logger.info(
@@ -69,6 +77,7 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
         await _broadcast_task
     except asyncio.CancelledError:
         pass
+    _dsp.stop()
     acq.stop()
 
 
@@ -101,6 +110,8 @@ async def websocket_endpoint(ws: WebSocket) -> None:
             # Keep connection alive; client doesn't send data
             await ws.receive_text()
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(ws)
 
 
@@ -112,5 +123,6 @@ if __name__ == "__main__":
         app,
         host=_cli_args.host,
         port=_cli_args.port,
+        # loop/http stay on "auto", which picks uvloop and httptools when installed
         log_level="info",
     )
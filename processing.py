@@ -1,16 +1,19 @@
 """Stateless DSP functions for EEG signal processing.
 
-Uses BrainFlow's DataFilter for FFT, band power extraction, and
-signal quality estimation. All functions are pure and operate on
-numpy arrays.
+Computes one Welch PSD per channel with numpy's real FFT and derives
+the spectrum, band powers, and signal quality from it. All functions
+are pure, operate on numpy arrays, and process every channel of a
+(channels x samples) slab in one vectorized pass.
 """
 
 from __future__ import annotations
 
 import time
+from collections.abc import Iterable
+from dataclasses import dataclass
 
 import numpy as np
-from brainflow.data_filter import DataFilter
+from numpy.lib.stride_tricks import sliding_window_view
 from numpy.typing import NDArray
 
 # Frequency bands (Hz)
@@ -21,179 +24,272 @@ BANDS = {
     "beta": (13.0, 30.0),
     "gamma": (30.0, 50.0),
 }
+BAND_NAMES = tuple(BANDS)
 
 # Signal quality thresholds
 _RMS_MIN = 0.5   # µV — below this, likely flatline
 _RMS_MAX = 200.0  # µV — above this, likely artifact
 _LINE_NOISE_RATIO_MAX = 0.4  # 50/60 Hz power as fraction of total
+_LINE_NOISE_BANDS = ((48.0, 52.0), (58.0, 62.0))  # Hz, around 50 and 60 Hz mains
 
+# Upper bound of the spectrum sent to clients (Hz)
+_MAX_DISPLAY_FREQ = 60.0
 
-def compute_fft(
-    channel_data: NDArray[np.float64],
-    sampling_rate: int,
-    max_freq: float = 60.0,
-) -> tuple[NDArray[np.float64], NDArray[np.float64]]:
-    """Compute PSD using Welch's method via BrainFlow.
+# Raw samples sent per channel per update; longer tails are decimated
+_MAX_DISPLAY_SAMPLES = 64
 
-    Returns (freqs, psd) arrays truncated to max_freq.
+
+@dataclass(frozen=True)
+class PlanCtx:
+    """Per-(sampling rate, nfft) constants for the Welch PSD.
+
+    Built once by `prepare_plan` so ticks never rebuild the window,
+    the frequency grid, or the band edge indices.
     """
-    nfft = _largest_power_of_2(len(channel_data))
-    if nfft < 64:
-        return np.array([]), np.array([])
-
-    psd = DataFilter.get_psd_welch(
-        channel_data,
-        nfft=nfft,
-        overlap=nfft // 2,
-        sampling_rate=sampling_rate,
-        window=2,  # Hamming
-    )
-    # psd is a 2D array: [amplitudes, frequencies]
-    amplitudes = psd[0]
-    freqs = psd[1]
 
-    # Truncate to max_freq
-    mask = freqs <= max_freq
-    return freqs[mask], amplitudes[mask]
+    sampling_rate: int
+    nfft: int
+    window: NDArray[np.float32]
+    freqs: NDArray[np.float64]
+    df: float  # frequency resolution (Hz)
+    display_bins: int  # number of leading bins at or below _MAX_DISPLAY_FREQ
+    band_bounds: NDArray[np.intp]  # [lo, hi) bins per BANDS entry, in order
+    line_noise_bounds: NDArray[np.intp]  # [lo, hi) bins per _LINE_NOISE_BANDS entry
+
+    def fits(self, num_samples: int) -> bool:
+        """Whether `num_samples` maps to this plan's nfft."""
+        return self.nfft <= num_samples < 2 * self.nfft
+
+    def __reduce__(self) -> tuple:
+        # Pickle by key: a worker process rebuilds the plan from its own
+        # cache instead of receiving the arrays with every call.
+        return prepare_plan, (self.sampling_rate, self.nfft)
+
+
+_PLAN_CACHE: dict[tuple[int, int], PlanCtx] = {}
+
+
+def prepare_plan(sampling_rate: int, num_samples: int) -> PlanCtx:
+    """Return the cached PSD plan for a window of `num_samples` samples."""
+    nfft = _largest_power_of_2(num_samples)
+    key = (sampling_rate, nfft)
+    plan = _PLAN_CACHE.get(key)
+    if plan is None:
+        # Periodic Hamming window, as used by BrainFlow
+        window = np.hamming(nfft + 1)[:-1].astype(np.float32)
+        freqs = np.fft.rfftfreq(nfft, d=1.0 / sampling_rate)
+        plan = PlanCtx(
+            sampling_rate=sampling_rate,
+            nfft=nfft,
+            window=window,
+            freqs=freqs,
+            df=sampling_rate / nfft,
+            display_bins=int(np.searchsorted(freqs, _MAX_DISPLAY_FREQ, side="right")),
+            band_bounds=_band_bounds(freqs, BANDS.values()),
+            line_noise_bounds=_band_bounds(freqs, _LINE_NOISE_BANDS),
+        )
+        _PLAN_CACHE[key] = plan
+    return plan
 
 
-def compute_band_powers(
-    channel_data: NDArray[np.float64],
-    sampling_rate: int,
-) -> dict[str, float]:
-    """Extract power in standard EEG frequency bands."""
-    nfft = _largest_power_of_2(len(channel_data))
-    if nfft < 64:
-        return {b: 0.0 for b in BANDS}
-
-    psd = DataFilter.get_psd_welch(
-        channel_data,
-        nfft=nfft,
-        overlap=nfft // 2,
-        sampling_rate=sampling_rate,
-        window=2,
+def warm_plans(sampling_rate: int, num_samples: int, n_channels: int) -> None:
+    """Build the PSD plan and run one throwaway DSP pass over silence.
+
+    Call once at startup in the process that will run the DSP, so the
+    first real update does not pay for plan construction or numpy's FFT
+    setup.
+    """
+    plan = prepare_plan(sampling_rate, num_samples)
+    silence = np.zeros((n_channels, num_samples), dtype=np.float32)
+    psd = compute_psd(silence, plan)
+    compute_band_powers(psd, plan)
+    compute_signal_quality(silence, psd, plan)
+
+
+def compute_psd(
+    samples: NDArray[np.float32],
+    plan: PlanCtx,
+) -> NDArray[np.float32]:
+    """Compute PSD using Welch's method with 50% overlapping Hamming segments.
+
+    Works along the last axis, so a (channels x samples) slab yields one
+    PSD row per channel. Scaled like BrainFlow's get_psd_welch.
+    Returns the full one-sided spectrum; frequencies are `plan.freqs`.
+    """
+    nfft = plan.nfft
+    # Every 50%-overlapping segment of every channel as one strided view,
+    # (channels x segments x nfft), transformed in a single batched rfft
+    segments = sliding_window_view(samples, nfft, axis=-1)[..., :: nfft // 2, :]
+    spectrum = np.fft.rfft(segments * plan.window, axis=-1)
+
+    power = spectrum.real**2
+    power += spectrum.imag**2
+    psd = power.mean(axis=-2).astype(np.float32, copy=False)
+    psd /= plan.sampling_rate * nfft
+    psd[..., 1:-1] *= 2.0  # fold negative frequencies; DC and Nyquist appear once
+    return psd
+
+
+def _band_bounds(
+    freqs: NDArray[np.float64],
+    bands: Iterable[tuple[float, float]],
+) -> NDArray[np.intp]:
+    """[lo, hi) PSD bin ranges for each band, following BrainFlow's get_band_power.
+
+    BrainFlow integrates from the first bin >= `low` through the first
+    bin > `high`. `hi` is kept below len(freqs), as np.add.reduceat
+    requires.
+    """
+    last = len(freqs) - 1
+    return np.array(
+        [
+            (
+                np.searchsorted(freqs, low, side="left"),
+                min(np.searchsorted(freqs, high, side="right") + 1, last),
+            )
+            for low, high in bands
+        ],
+        dtype=np.intp,
     )
 
-    powers: dict[str, float] = {}
-    for band_name, (low, high) in BANDS.items():
-        try:
-            power = DataFilter.get_band_power(psd, low, high)
-            powers[band_name] = float(power)
-        except Exception:
-            powers[band_name] = 0.0
 
-    return powers
+def _band_powers(
+    psd: NDArray[np.float32],
+    bounds: NDArray[np.intp],
+    df: float,
+) -> NDArray[np.float32]:
+    """Trapezoidal power of each [lo, hi) range of `bounds` along the last axis.
+
+    One np.add.reduceat pass sums every range (the interleaved lo/hi
+    indices also yield the gaps between ranges, which are dropped); the
+    trapezoid rule is that sum minus half of each range's end bins.
+    """
+    sums = np.add.reduceat(psd, bounds.ravel(), axis=-1)[..., ::2]
+    ends = psd[..., bounds[:, 0]] + psd[..., bounds[:, 1] - 1]
+    return (sums - 0.5 * ends) * df
+
+
+def compute_band_powers(
+    psd: NDArray[np.float32],
+    plan: PlanCtx,
+) -> NDArray[np.float32]:
+    """Extract power in standard EEG frequency bands from a PSD.
+
+    Returns an array of shape psd.shape[:-1] + (len(BANDS),), with
+    bands in BANDS order.
+    """
+    return _band_powers(psd, plan.band_bounds, plan.df)
 
 
 def compute_signal_quality(
-    channel_data: NDArray[np.float64],
-    sampling_rate: int,
-) -> float:
+    samples: NDArray[np.float32],
+    psd: NDArray[np.float32],
+    plan: PlanCtx,
+) -> NDArray[np.float64]:
     """Heuristic signal quality score from 0.0 (bad) to 1.0 (good).
 
+    Scores every row of `samples` (with its matching `psd` row).
     Checks for:
     - RMS amplitude in expected range
     - Flatline detection (very low variance)
     - Line noise contamination (50/60 Hz)
     """
-    if len(channel_data) < 64:
-        return 0.0
-
-    score = 1.0
+    if samples.shape[-1] < 64:
+        return np.zeros(samples.shape[:-1])
+
+    # RMS and standard deviation from the first two moments. Accumulate in
+    # double precision: var = E[x²] - mean² cancels badly with a DC offset.
+    n = samples.shape[-1]
+    mean = samples.sum(axis=-1, dtype=np.float64) / n
+    # Row-wise dot product: no squared copy of the slab is materialized
+    mean_sq = np.einsum("...i,...i->...", samples, samples, dtype=np.float64) / n
+    rms = np.sqrt(mean_sq)
+    std = np.sqrt(np.maximum(mean_sq - mean**2, 0.0))
 
     # RMS check
-    rms = float(np.sqrt(np.mean(channel_data**2)))
-    if rms < _RMS_MIN:
-        score *= 0.2  # likely flatline
-    elif rms > _RMS_MAX:
-        score *= 0.3  # likely artifact
+    score = np.where(rms < _RMS_MIN, 0.2, 1.0)  # likely flatline
+    score = np.where(rms > _RMS_MAX, 0.3, score)  # likely artifact
 
     # Flatline: standard deviation near zero
-    std = float(np.std(channel_data))
-    if std < 0.1:
-        score *= 0.1
+    score = np.where(std < 0.1, score * 0.1, score)
 
     # Line noise check (50/60 Hz band vs total)
-    try:
-        nfft = _largest_power_of_2(len(channel_data))
-        psd = DataFilter.get_psd_welch(
-            channel_data, nfft=nfft, overlap=nfft // 2,
-            sampling_rate=sampling_rate, window=2,
-        )
-        total_power = float(np.sum(psd[0]))
-        if total_power > 0:
-            noise_power_50 = float(DataFilter.get_band_power(psd, 48.0, 52.0))
-            noise_power_60 = float(DataFilter.get_band_power(psd, 58.0, 62.0))
-            noise_ratio = (noise_power_50 + noise_power_60) / total_power
-            if noise_ratio > _LINE_NOISE_RATIO_MAX:
-                score *= 0.5
-    except Exception:
-        pass
+    total_power = psd.sum(axis=-1)
+    noise_power = _band_powers(psd, plan.line_noise_bounds, plan.df).sum(axis=-1)
+    noise_ratio = np.divide(
+        noise_power, total_power,
+        out=np.zeros_like(total_power), where=total_power > 0,
+    )
+    score = np.where(noise_ratio > _LINE_NOISE_RATIO_MAX, score * 0.5, score)
 
-    return max(0.0, min(1.0, score))
+    return np.clip(score, 0.0, 1.0)
 
 
 def process_all_channels(
-    data: NDArray[np.float64],
-    eeg_channels: list[int],
+    eeg: NDArray[np.float32],
     channel_names: tuple[str, ...],
-    sampling_rate: int,
+    plan: PlanCtx,
     raw_tail: int = 0,
 ) -> dict:
-    """Process all EEG channels and return a JSON-serializable dict.
+    """Process all EEG channels and return the payload dict for clients.
+
+    Values are left as numpy arrays; encode the result with orjson's
+    OPT_SERIALIZE_NUMPY. Band powers and signal quality are sent as
+    fixed-layout arrays (rows in `channel_names` order, columns in
+    BAND_NAMES order); raw and spectrum data are keyed by channel name.
 
     Args:
-        data: Full board data array (all channels x samples).
-        eeg_channels: Indices of EEG channels in the data array.
+        eeg: EEG samples (channels x samples), rows in `channel_names` order.
         channel_names: Human-readable names for each EEG channel.
-        sampling_rate: Board sampling rate in Hz.
+        plan: PSD plan from `prepare_plan` for the expected window size.
+            Replaced by a matching cached plan while the board's ring
+            buffer still holds fewer samples.
         raw_tail: Number of most-recent raw samples to include.
-            0 means send all samples.
+            0 means send all samples. Either way at most
+            _MAX_DISPLAY_SAMPLES are sent, decimated by striding.
     """
     result: dict = {
         "timestamp": time.time(),
+        "channel_names": list(channel_names),
+        "band_names": list(BAND_NAMES),
         "raw": {},
         "fft": {"freqs": []},
-        "band_powers": {},
-        "signal_quality": {},
+        "band_powers": np.zeros((len(channel_names), len(BAND_NAMES)), dtype=np.float32),
+        "signal_quality": np.zeros(len(channel_names), dtype=np.float32),
     }
 
-    num_samples = data.shape[1] if data.ndim == 2 else 0
+    num_samples = eeg.shape[1] if eeg.ndim == 2 else 0
     if num_samples < 64:
         # Not enough data yet — return empty structure
         for name in channel_names:
             result["raw"][name] = []
             result["fft"][name] = []
-            result["band_powers"][name] = {b: 0.0 for b in BANDS}
-            result["signal_quality"][name] = 0.0
         return result
 
-    freqs_set = False
-
-    for ch_idx, name in zip(eeg_channels, channel_names):
-        if ch_idx >= data.shape[0]:
-            continue
-
-        channel_data = data[ch_idx].copy()
+    # µV readings of 16-bit origin — single precision is plenty for the DSP
+    eeg = np.asarray(eeg, dtype=np.float32)
 
-        # Raw waveform — send only the tail for incremental display
-        if raw_tail > 0 and len(channel_data) > raw_tail:
-            result["raw"][name] = channel_data[-raw_tail:].tolist()
-        else:
-            result["raw"][name] = channel_data.tolist()
+    if not plan.fits(num_samples):
+        plan = prepare_plan(plan.sampling_rate, num_samples)
+    psd = compute_psd(eeg, plan)
+    result["band_powers"] = compute_band_powers(psd, plan)
+    result["signal_quality"] = compute_signal_quality(eeg, psd, plan).astype(np.float32)
 
-        # FFT
-        freqs, psd_values = compute_fft(channel_data, sampling_rate)
-        if not freqs_set:
-            result["fft"]["freqs"] = freqs.tolist()
-            freqs_set = True
-        result["fft"][name] = psd_values.tolist()
+    # FFT — truncated to the displayed range
+    shown = plan.display_bins
+    result["fft"]["freqs"] = plan.freqs[:shown]
 
-        # Band powers
-        result["band_powers"][name] = compute_band_powers(channel_data, sampling_rate)
+    # Raw waveform — send only the tail for incremental display, rounded to 0.1 µV
+    raw = eeg[:, -raw_tail:] if 0 < raw_tail < num_samples else eeg
+    step = -(-raw.shape[1] // _MAX_DISPLAY_SAMPLES)
+    if step > 1:
+        # Keep every step-th sample, aligned so the newest one is included
+        raw = raw[:, (raw.shape[1] - 1) % step :: step]
+    raw = raw.round(1)
 
-        # Signal quality
-        result["signal_quality"][name] = compute_signal_quality(channel_data, sampling_rate)
+    for i, name in enumerate(channel_names):
+        result["raw"][name] = raw[i]
+        result["fft"][name] = psd[i, :shown]
 
     return result
 
@@ -202,7 +298,4 @@ def _largest_power_of_2(n: int) -> int:
     """Return the largest power of 2 <= n."""
     if n <= 0:
         return 0
-    p = 1
-    while p * 2 <= n:
-        p <<= 1
-    return p
+    return 1 << (n.bit_length() - 1)
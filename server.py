@@ -8,21 +8,52 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import math
+import multiprocessing
+import signal
 import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Callable
 
+import orjson
 from fastapi import WebSocket
 
 from acquisition import EEGAcquisition
-from processing import process_all_channels
+from processing import prepare_plan, process_all_channels, warm_plans
 
 logger = logging.getLogger(__name__)
 
 
+# Seconds of data behind each FFT/band power estimate
+WINDOW_SECONDS = 4.0
+
+# Frames buffered per client before the oldest is dropped
+_CLIENT_QUEUE_SIZE = 4
+
+# Consecutive DSP timeouts before the worker is assumed hung and replaced
+_MAX_DSP_TIMEOUTS = 3
+
+
+@dataclass
+class ClientState:
+    """A connected client's bounded frame queue and the task draining it."""
+
+    queue: asyncio.Queue[bytes]
+    writer: asyncio.Task[None]
+
+
 class ConnectionManager:
-    """Track active WebSocket connections."""
+    """Track active WebSocket connections.
+
+    Each client gets a bounded frame queue drained by its own writer
+    task, so a slow client loses stale frames instead of stalling the
+    broadcast loop.
+    """
 
     def __init__(self) -> None:
-        self._connections: list[WebSocket] = []
+        self._connections: dict[WebSocket, ClientState] = {}
 
     @property
     def has_clients(self) -> bool:
@@ -34,67 +65,177 @@ class ConnectionManager:
 
     async def connect(self, ws: WebSocket) -> None:
         await ws.accept()
-        self._connections.append(ws)
+        queue: asyncio.Queue[bytes] = asyncio.Queue(maxsize=_CLIENT_QUEUE_SIZE)
+        writer = asyncio.create_task(self._writer(ws, queue))
+        self._connections[ws] = ClientState(queue=queue, writer=writer)
         logger.info("Client connected (%d total)", len(self._connections))
 
     def disconnect(self, ws: WebSocket) -> None:
-        if ws in self._connections:
-            self._connections.remove(ws)
+        state = self._connections.pop(ws, None)
+        if state is not None:
+            state.writer.cancel()
             logger.info("Client disconnected (%d remaining)", len(self._connections))
 
-    async def broadcast_json(self, data: dict) -> None:
-        """Send JSON to all connected clients, removing dead connections."""
-        dead: list[WebSocket] = []
-        for ws in self._connections:
+    def broadcast_json(self, data: dict) -> None:
+        """Queue JSON for all connected clients.
+
+        The frame is encoded once (numpy arrays included) and handed to
+        every client's writer as UTF-8 bytes. A client whose queue is
+        full drops its oldest frame.
+        """
+        if not self._connections:
+            return
+
+        payload = orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+        for state in self._connections.values():
+            if state.queue.full():
+                state.queue.get_nowait()
+            state.queue.put_nowait(payload)
+
+    async def _writer(self, ws: WebSocket, queue: asyncio.Queue[bytes]) -> None:
+        """Send queued frames to `ws` until the socket fails."""
+        while True:
+            payload = await queue.get()
             try:
-                await ws.send_json(data)
+                await ws.send_bytes(payload)
             except Exception:
-                dead.append(ws)
+                break
+        self.disconnect(ws)
 
-        for ws in dead:
-            self.disconnect(ws)
+
+def _ignore_sigint() -> None:
+    """DSP worker initializer: leave Ctrl+C to the server's own shutdown."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class DSPWorker:
+    """Single worker process that runs the DSP off the event loop.
+
+    Keeps numpy work from holding the GIL the websocket writers need.
+    A dead or hung process is replaced with `restart()`, so a crash
+    costs a frame or two rather than the rest of the session.
+    """
+
+    def __init__(self, sampling_rate: int, num_samples: int, n_channels: int) -> None:
+        self._warm_args = (sampling_rate, num_samples, n_channels)
+        self._executor: ProcessPoolExecutor | None = None
+
+    async def start(self) -> None:
+        """Start the worker process and build its PSD plan."""
+        # Spawn rather than fork: this process already runs BrainFlow threads
+        self._executor = ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_ignore_sigint,
+        )
+        await asyncio.get_running_loop().run_in_executor(
+            self._executor, warm_plans, *self._warm_args,
+        )
+
+    def stop(self) -> None:
+        """Kill the worker process without waiting for a call in flight."""
+        self._kill()
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run `fn(*args)` in the worker process and return its result.
+
+        Raises BrokenProcessPool if the worker died; call `restart()` to
+        replace it.
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def restart(self) -> None:
+        """Kill the worker process, even mid-call, and start a new one."""
+        self._kill()
+        await self.start()
+
+    def _kill(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        # terminate_workers() is Python 3.14+; before that the worker
+        # processes are only reachable through a private attribute
+        if hasattr(executor, "terminate_workers"):
+            executor.terminate_workers()
+        else:
+            for proc in list((executor._processes or {}).values()):
+                proc.terminate()
+            executor.shutdown(wait=False, cancel_futures=True)
 
 
 async def broadcast_loop(
     acq: EEGAcquisition,
     manager: ConnectionManager,
+    dsp: DSPWorker,
     update_hz: float = 12.0,
 ) -> None:
     """Continuously broadcast processed EEG data to connected clients.
 
-    Runs at `update_hz` rate. Skips processing when no clients are connected.
-    Uses asyncio.to_thread() for CPU-bound DSP work.
+    Runs at `update_hz` rate. Skips processing when no clients are connected
+    or when the board has produced no new samples since the last update.
+    CPU-bound DSP work runs in the `dsp` worker process. Ticks that overrun
+    their deadline drop the missed frames instead of catching up. A DSP
+    call taking over 1.5 intervals has its result discarded; the worker
+    keeps running it, so after repeated timeouts the worker is replaced.
     """
     interval = 1.0 / update_hz
-    # Fetch ~4 seconds of data for FFT/band power analysis
-    window_seconds = 4.0
     # Only send the latest chunk of raw samples per update for display
     raw_chunk = max(1, int(acq.sampling_rate / update_hz))
+    num_samples = int(acq.sampling_rate * WINDOW_SECONDS)
+    plan = prepare_plan(acq.sampling_rate, num_samples)
+    # Timestamp of the newest sample already broadcast
+    last_ts: float | None = None
+    timeouts = 0
+    # Set when the worker died or hung; replaced at the start of the next
+    # tick, outside the DSP timeout, since spawning it takes seconds
+    restart_dsp = False
 
     logger.info("Broadcast loop started at %.1f Hz", update_hz)
 
+    next_tick = time.monotonic() + interval
     while True:
-        loop_start = time.monotonic()
-
         try:
+            if restart_dsp:
+                restart_dsp = False
+                timeouts = 0
+                await dsp.restart()
+
             if manager.has_clients:
-                num_samples = int(acq.sampling_rate * window_seconds)
-                data = acq.get_latest_data(num_samples)
-
-                if data.shape[1] > 0:
-                    result = await asyncio.to_thread(
-                        process_all_channels,
-                        data,
-                        acq.eeg_channels,
-                        acq.channel_names,
-                        acq.sampling_rate,
-                        raw_chunk,
+                eeg = acq.get_latest_eeg(num_samples)
+
+                if eeg.shape[1] > 0 and acq.latest_timestamp != last_ts:
+                    last_ts = acq.latest_timestamp
+                    result = await asyncio.wait_for(
+                        dsp.run(
+                            process_all_channels,
+                            eeg,
+                            acq.channel_names,
+                            plan,
+                            raw_chunk,
+                        ),
+                        timeout=interval * 1.5,
                     )
-                    await manager.broadcast_json(result)
-
+                    timeouts = 0
+                    manager.broadcast_json(result)
+            else:
+                last_ts = None
+
+        except asyncio.TimeoutError:
+            timeouts += 1
+            logger.warning("DSP took longer than %.0f ms, dropping frame", interval * 1.5e3)
+            if timeouts >= _MAX_DSP_TIMEOUTS:
+                logger.warning("DSP timed out %d times in a row, restarting worker", timeouts)
+                restart_dsp = True
+        except BrokenProcessPool:
+            logger.warning("DSP worker died, restarting it and dropping frame")
+            restart_dsp = True
         except Exception:
             logger.exception("Error in broadcast loop")
 
-        elapsed = time.monotonic() - loop_start
-        sleep_time = max(0.0, interval - elapsed)
-        await asyncio.sleep(sleep_time)
+        now = time.monotonic()
+        if now > next_tick:
+            # Overran the tick: drop the missed frames and rejoin the schedule
+            # rather than running updates back to back to catch up
+            next_tick += math.ceil((now - next_tick) / interval) * interval
+        await asyncio.sleep(next_tick - now)
+        next_tick += interval
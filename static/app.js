@@ -20,6 +20,8 @@ const RAW_BUFFER_MAX = 1024;
 const rawBuffers = {};
 CHANNEL_NAMES.forEach(ch => { rawBuffers[ch] = []; });
 
+const textDecoder = new TextDecoder();
+
 let ws = null;
 let chartsInitialized = false;
 let reconnectTimeout = null;
@@ -155,8 +157,8 @@ function initBandChart() {
 function updateCharts(data) {
     updateRawChart(data.raw);
     updateFFTChart(data.fft);
-    updateBandChart(data.band_powers);
-    updateSignalQuality(data.signal_quality);
+    updateBandChart(data.channel_names, data.band_names, data.band_powers);
+    updateSignalQuality(data.channel_names, data.signal_quality);
 }
 
 function updateRawChart(raw) {
@@ -203,26 +205,30 @@ function updateFFTChart(fft) {
     );
 }
 
-function updateBandChart(bandPowers) {
+// bandPowers is a [channel][band] matrix laid out by the channels/bands name lists
+function updateBandChart(channels, bands, bandPowers) {
     Plotly.react(
         "band-chart",
-        CHANNEL_NAMES.map((ch, i) => ({
-            x: BAND_NAMES,
-            y: BAND_NAMES.map(b => (bandPowers[ch] || {})[b] || 0),
-            type: "bar",
-            name: ch,
-            marker: { color: CHANNEL_COLORS[i] },
-        })),
+        CHANNEL_NAMES.map((ch, i) => {
+            const row = bandPowers[channels.indexOf(ch)] || [];
+            return {
+                x: BAND_NAMES,
+                y: BAND_NAMES.map(b => row[bands.indexOf(b)] || 0),
+                type: "bar",
+                name: ch,
+                marker: { color: CHANNEL_COLORS[i] },
+            };
+        }),
         document.getElementById("band-chart").layout
     );
 }
 
-function updateSignalQuality(quality) {
+function updateSignalQuality(channels, quality) {
     CHANNEL_NAMES.forEach(ch => {
         const dot = document.getElementById(`quality-${ch}`);
         if (!dot) return;
 
-        const score = quality[ch] || 0;
+        const score = quality[channels.indexOf(ch)] || 0;
         dot.classList.remove("good", "fair", "poor");
 
         if (score >= 0.7) {
@@ -262,6 +268,7 @@ async function fetchBoardInfo() {
 function connect() {
     const protocol = location.protocol === "https:" ? "wss:" : "ws:";
     ws = new WebSocket(`${protocol}//${location.host}/ws`);
+    ws.binaryType = "arraybuffer";
 
     ws.onopen = () => {
         console.log("WebSocket connected");
@@ -273,7 +280,9 @@ function connect() {
     };
 
     ws.onmessage = (event) => {
-        const data = JSON.parse(event.data);
+        // Server sends UTF-8 JSON as binary frames; accept text frames too
+        const text = typeof event.data === "string" ? event.data : textDecoder.decode(event.data);
+        const data = JSON.parse(text);
         if (!chartsInitialized) {
             initCharts();
         }